@@ -1,5 +1,14 @@
 from datetime import datetime
 
+try:
+    from ciso8601 import parse_datetime as parse_timestamp
+except ImportError:
+    def parse_timestamp(timestamp):
+        # Only rewrite the string when it carries a 'Z' suffix, which older fromisoformat rejects
+        if timestamp.endswith('Z'):
+            timestamp = timestamp[:-1] + '+00:00'
+        return datetime.fromisoformat(timestamp)
+
 def generate_daily_brief(data, top_n=10):
     brief = []
     brief.append("=" * 50)
@@ -25,9 +34,9 @@ def generate_daily_brief(data, top_n=10):
         if isinstance(timestamp, str):
             try:
                 # Try to parse the string as datetime
-                timestamp_obj = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                timestamp_obj = parse_timestamp(timestamp)
                 timestamp_str = timestamp_obj.strftime('%m/%d %H:%M')
-            except:
+            except ValueError:
                 # If parsing fails, use the string as is
                 timestamp_str = str(timestamp)
         else:
@@ -3,15 +3,131 @@ Context Loader for SmartBrief v3
 Manages conversation history and context for improved summarization.
 """
 
+import atexit
+import csv
+import heapq
+import itertools
 import json
 import os
+import threading
+import time
+import weakref
+import numpy as np
 import pandas as pd
+from array import array
+from collections import Counter, deque
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Dict, List, Optional, Any
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+
+try:
+    from ciso8601 import parse_datetime as _parse_datetime
+except ImportError:
+    _parse_datetime = datetime.fromisoformat
+
 logger = logging.getLogger(__name__)
 
+# Column order of the message history CSV
+CSV_COLUMNS = [
+    'message_id', 'user_id', 'platform', 'message_text',
+    'timestamp', 'intent', 'urgency', 'summary', 'context_used'
+]
+
+# In-memory history columns derived from CSV_COLUMNS; never written to disk
+DERIVED_COLUMNS = ['ts_epoch', 'msg_len']
+
+# Numpy dtypes of history columns that are scanned numerically
+COLUMN_DTYPES = {'ts_epoch': np.float64, 'msg_len': np.int32, 'context_used': np.bool_}
+
+
+# Loaders whose buffered rows and log may still need writing at exit
+_live_loaders = weakref.WeakSet()
+
+
+def _close_live_loaders():
+    for loader in list(_live_loaders):
+        loader.close()
+
+
+atexit.register(_close_live_loaders)
+
+
+def _json_dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize JSON (compact unless indent is set), using orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option).decode('utf-8')
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
+
+
+def _json_loads(data: str) -> Any:
+    """Parse JSON, using orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # Files written by the json module may contain NaN, which orjson rejects
+            pass
+    return json.loads(data)
+
+
+@contextmanager
+def _atomic_open(path: str, durable: bool = False, **kwargs):
+    """Open a temporary sibling of path for writing and rename it over path on success."""
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', **kwargs) as f:
+            yield f
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@lru_cache(maxsize=4096)
+def _parse_epoch(timestamp: str) -> float:
+    """Convert an ISO timestamp to epoch seconds; repeated strings hit the cache."""
+    return _parse_datetime(timestamp).timestamp()
+
+
+def _timestamp_epoch(timestamp: Any) -> float:
+    """Convert an ISO timestamp to epoch seconds, or NaN if it cannot be parsed."""
+    try:
+        return _parse_epoch(str(timestamp))
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def _entry_epoch(entry: Dict) -> float:
+    """Return the entry's timestamp as epoch seconds, caching it on the entry.
+    
+    Entries with a missing or malformed timestamp get NaN, which never passes
+    a retention cutoff, so they expire at the next compaction.
+    """
+    ts_epoch = entry.get('ts_epoch')
+    if ts_epoch is None:
+        ts_epoch = entry['ts_epoch'] = _timestamp_epoch(entry.get('timestamp'))
+    return ts_epoch
+
 class ContextLoader:
     """
     Manages conversation context and history for the summarization system.
@@ -26,25 +142,72 @@ class ContextLoader:
     
     def __init__(self, json_file: str = 'conversation_history.json', 
                  csv_file: str = 'message_history.csv', 
-                 max_context_days: int = 30):
+                 max_context_days: int = 30,
+                 compact_every: int = 1000,
+                 csv_batch_size: int = 256,
+                 recent_cache_size: int = 20,
+                 flush_interval: float = 0.25,
+                 durable: bool = False):
         self.json_file = json_file
         self.csv_file = csv_file
         self.max_context_days = max_context_days
         
+        # Snapshots are written to a temp file and renamed into place;
+        # durable additionally fsyncs them before the rename
+        self.durable = durable
+        
+        # Append-only JSON-Lines log, folded into json_file on compaction
+        self.json_log_file = json_file + '.log'
+        self.compact_every = compact_every
+        self._json_log = None
+        self._log_entries = 0
+        
         # Load existing data
         self.conversation_data = self._load_json_data()
-        self.message_history = self._load_csv_data()
+        self._replay_json_log()
+        self.csv_batch_size = csv_batch_size
+        self._pending_rows = []    # rows not yet appended to csv_file
+        self._csv_handle = None
+        self._csv_writer = None
+        
+        # Column store of the message history (column -> list of values)
+        self._cols = {}
+        self._arrays = {}
+        self._history_df = None
+        
+        # Most recent rows per (user_id, platform), oldest first
+        self.recent_cache_size = recent_cache_size
+        self._recent = {}
         
-        # Context cache for performance
+        # Column-oriented copy of the history for similarity search
+        self._reset_search_index()
+        
+        # user_id -> (total_messages when computed, analytics dict)
+        self._analytics_cache = {}
+        
+        # Bumped on every write; get_statistics reuses its result until then
+        self._data_version = 0
+        self._stats_cache = None   # (data version when computed, statistics dict)
+        
+        # (user_id, platform) -> {limit: context messages}; dropped when that pair changes
         self.context_cache = {}
-        self.cache_expiry = {}
+        self.message_history = self._load_csv_data()
+        
+        # Background writer that coalesces bursts of inserts into one flush
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._dirty = threading.Event()
+        self._writer = None
+        
+        # Flush buffered rows and compact the log on interpreter exit
+        _live_loaders.add(self)
     
     def _load_json_data(self) -> Dict:
         """Load conversation data from JSON file."""
         if os.path.exists(self.json_file):
             try:
                 with open(self.json_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    return _json_loads(f.read())
             except Exception as e:
                 logger.error(f"Error loading JSON data: {e}")
         
@@ -57,36 +220,362 @@ class ContextLoader:
             }
         }
     
+    def _replay_json_log(self):
+        """Fold entries from the append-only log into the loaded conversation data."""
+        if not os.path.exists(self.json_log_file):
+            return
+        
+        conversations = self.conversation_data.setdefault('conversations', {})
+        known_ids = {}
+        
+        try:
+            with open(self.json_log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = _json_loads(line)
+                    except ValueError:
+                        # Torn final line from an interrupted write
+                        logger.warning("Skipping malformed line in JSON log")
+                        continue
+                    
+                    key = record['conversation_key']
+                    entry = record['entry']
+                    messages = conversations.setdefault(key, [])
+                    
+                    # Entries already folded by an interrupted compaction
+                    if key not in known_ids:
+                        known_ids[key] = {msg.get('message_id') for msg in messages}
+                    if entry.get('message_id') in known_ids[key]:
+                        continue
+                    known_ids[key].add(entry.get('message_id'))
+                    
+                    messages.append(entry)
+                    self._update_user_profile(record['user_id'], record['platform'], {},
+                                              entry.get('analysis'), seen_at=record.get('seen_at'))
+                    self._log_entries += 1
+        except Exception as e:
+            logger.error(f"Error replaying JSON log: {e}")
+    
+    def _append_json_log(self, record: Dict):
+        """Append a single conversation record to the JSON-Lines log."""
+        try:
+            if self._json_log is None:
+                self._json_log = open(self.json_log_file, 'a', encoding='utf-8')
+            self._json_log.write(_json_dumps(record) + '\n')
+            self._log_entries += 1
+        except Exception as e:
+            logger.error(f"Error appending to JSON log: {e}")
+    
+    def _compact_json(self):
+        """Apply the retention cutoff and fold the log into a consolidated JSON file."""
+        cutoff = (datetime.now() - timedelta(days=self.max_context_days)).timestamp()
+        conversations = self.conversation_data.get('conversations', {})
+        for key, messages in conversations.items():
+            conversations[key] = [msg for msg in messages if _entry_epoch(msg) > cutoff]
+        
+        self._save_json_data()
+    
     def _save_json_data(self):
-        """Save conversation data to JSON file."""
+        """Save conversation data to JSON file and truncate the append-only log."""
         try:
             self.conversation_data['metadata']['last_updated'] = datetime.now().isoformat()
-            with open(self.json_file, 'w', encoding='utf-8') as f:
-                json.dump(self.conversation_data, f, indent=2, ensure_ascii=False)
+            with _atomic_open(self.json_file, self.durable) as f:
+                f.write(_json_dumps(self.conversation_data))
+            
+            # Everything in the log is now part of the snapshot
+            if self._json_log is not None:
+                self._json_log.close()
+                self._json_log = None
+            if os.path.exists(self.json_log_file):
+                os.remove(self.json_log_file)
+            self._log_entries = 0
         except Exception as e:
             logger.error(f"Error saving JSON data: {e}")
     
+    def _schedule_flush(self):
+        """Wake the background writer, starting it on first use."""
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._writer_loop, name='context-loader-writer', daemon=True)
+            self._writer.start()
+        self._dirty.set()
+    
+    def _writer_loop(self):
+        """Flush buffered data shortly after each burst of writes until closed."""
+        while True:
+            self._dirty.wait()
+            time.sleep(self.flush_interval)
+            with self._lock:
+                if self._writer is not threading.current_thread():
+                    return
+                self._dirty.clear()
+                self.flush()
+    
+    def flush(self):
+        """Write buffered log entries and CSV rows, compacting the log once it has grown."""
+        with self._lock:
+            try:
+                if self._log_entries >= self.compact_every:
+                    self._compact_json()
+                elif self._json_log is not None:
+                    self._json_log.flush()
+                
+                self._flush_csv(force=True)
+                if self._csv_handle is not None:
+                    self._csv_handle.flush()
+            except Exception as e:
+                logger.error(f"Error flushing data: {e}")
+    
+    def close(self):
+        """Stop the background writer, compact pending log entries and release open file handles."""
+        with self._lock:
+            # Wake the writer so it sees it has been retired and exits
+            self._writer = None
+            self._dirty.set()
+            
+            try:
+                if self._json_log is not None or self._log_entries:
+                    self._compact_json()
+            except Exception as e:
+                # Still write the buffered CSV rows below
+                logger.error(f"Error compacting JSON log: {e}")
+            self._flush_csv(force=True)
+            self._close_csv_handle()
+            _live_loaders.discard(self)
+    
+    @property
+    def message_history(self) -> pd.DataFrame:
+        """Message history as a DataFrame, built from the column store on demand."""
+        if self._history_df is None:
+            self._history_df = pd.DataFrame(self._cols, columns=list(self._cols))
+        return self._history_df
+    
+    @message_history.setter
+    def message_history(self, df: pd.DataFrame):
+        self._cols = {column: df[column].tolist() for column in df.columns}
+        row_count = len(df)
+        for column in CSV_COLUMNS + DERIVED_COLUMNS:
+            self._cols.setdefault(column, [float('nan')] * row_count)
+        
+        self._cols['ts_epoch'] = [
+            epoch if epoch == epoch else _timestamp_epoch(ts)  # NaN != NaN
+            for epoch, ts in zip(self._cols['ts_epoch'], self._cols['timestamp'])
+        ]
+        self._cols['msg_len'] = [
+            len(text) if isinstance(text, str) else 0 for text in self._cols['message_text']
+        ]
+        # NaN is truthy, so missing flags need an explicit check
+        self._cols['context_used'] = [
+            bool(flag) and flag == flag for flag in self._cols['context_used']
+        ]
+        self._history_df = None
+        self._arrays = {}
+        self._analytics_cache = {}
+        self.context_cache = {}
+        self._data_version += 1
+        self._rebuild_indexes()
+    
+    def _column_array(self, column: str) -> np.ndarray:
+        """Return a history column as a numpy array, cached until the next write."""
+        array = self._arrays.get(column)
+        if array is None:
+            array = self._arrays[column] = np.asarray(
+                self._cols[column], dtype=COLUMN_DTYPES.get(column, object)
+            )
+        return array
+    
+    def _stored_columns(self) -> List[str]:
+        """History columns that are persisted, i.e. everything but the derived ones."""
+        return [column for column in self._cols if column not in DERIVED_COLUMNS]
+    
+    def _row_dict(self, position: int) -> Dict:
+        """Materialize one history row as a dictionary of its stored columns."""
+        return {column: self._cols[column][position] for column in self._stored_columns()}
+    
+    def _gather_frame(self, positions: List[int]) -> pd.DataFrame:
+        """Build a DataFrame holding only the given history rows."""
+        return pd.DataFrame(
+            {column: [values[i] for i in positions] for column, values in self._cols.items()},
+            columns=list(self._cols)
+        )
+    
+    def _rebuild_indexes(self):
+        """Rebuild the recent-message, row-position and search indexes from the columns."""
+        self._recent = {}
+        self._reset_search_index()
+        
+        row_count = len(self._cols['message_id'])
+        for position in range(row_count):
+            self._index_row(position)
+        
+        timestamps = self._cols['timestamp']
+        for position in sorted(range(row_count), key=lambda i: str(timestamps[i])):
+            self._index_recent(position)
+    
+    def _reset_search_index(self):
+        """Clear the row-position and token indexes."""
+        self._message_ids = set()
+        self._user_index = {}
+        self._platform_index = {}
+        self._intent_index = {}
+        self._urgency_index = {}
+        self._conversation_index = {}  # (user_id, platform) -> row positions
+        self._token_ids = {}     # token -> interned token id
+        self._postings = []      # token id -> array of row positions containing it
+        self._doc_sizes = []     # distinct tokens per row
+    
+    def _append_row(self, row: Dict):
+        """Append a history row to the column store and all indexes."""
+        position = len(self._cols['message_id'])
+        for column, values in self._cols.items():
+            values.append(row.get(column))
+        self._history_df = None
+        self._arrays = {}
+        self._data_version += 1
+        
+        self._index_row(position)
+        self._index_recent(position)
+    
+    def _append_frame(self, df: pd.DataFrame):
+        """Append the rows of a DataFrame without rebuilding the existing history."""
+        row_count = len(self._cols['message_id'])
+        for column in df.columns:
+            # Columns this history has not seen yet, e.g. from an older export
+            if column not in self._cols:
+                self._cols[column] = [float('nan')] * row_count
+        
+        for row in df.to_dict('records'):
+            ts_epoch = row.get('ts_epoch')
+            if ts_epoch is None or ts_epoch != ts_epoch:
+                row['ts_epoch'] = _timestamp_epoch(row.get('timestamp'))
+            text = row.get('message_text')
+            row['msg_len'] = len(text) if isinstance(text, str) else 0
+            flag = row.get('context_used')
+            row['context_used'] = bool(flag) and flag == flag
+            self._append_row(row)
+        
+        self._analytics_cache = {}
+        self.context_cache = {}
+    
+    def _index_row(self, position: int):
+        """Add a stored row to the row-position and token indexes."""
+        self._message_ids.add(self._cols['message_id'][position])
+        user_id = self._intern_value('user_id', self._user_index, position)
+        platform = self._intern_value('platform', self._platform_index, position)
+        self._intern_value('intent', self._intent_index, position)
+        self._intern_value('urgency', self._urgency_index, position)
+        self._conversation_index.setdefault((user_id, platform), []).append(position)
+        
+        tokens = frozenset(str(self._cols['message_text'][position]).lower().split())
+        for token in tokens:
+            token_id = self._token_ids.get(token)
+            if token_id is None:
+                token_id = self._token_ids[token] = len(self._postings)
+                self._postings.append(array('I'))
+            self._postings[token_id].append(position)
+        self._doc_sizes.append(len(tokens))
+    
+    def _intern_value(self, column: str, index: Dict, position: int) -> Any:
+        """Record a row under its column value, sharing one object per distinct value."""
+        value = self._cols[column][position]
+        if value is None or value != value:
+            return value  # Missing (None/NaN) values are not indexed
+        
+        positions = index.get(value)
+        if positions is None:
+            positions = index[value] = []
+        else:
+            # Reuse the key object so repeated strings are stored once
+            value = self._cols[column][position] = self._cols[column][positions[0]]
+        positions.append(position)
+        return value
+    
+    def _index_recent(self, position: int):
+        """Add a stored row to the recent-message index, keeping timestamp order."""
+        timestamps = self._cols['timestamp']
+        key = (self._cols['user_id'][position], self._cols['platform'][position])
+        recent = self._recent.get(key)
+        if recent is None:
+            recent = self._recent[key] = deque(maxlen=self.recent_cache_size)
+        
+        if recent and str(timestamps[position]) < str(timestamps[recent[-1]]):
+            # Out-of-order insert; re-sort the (small) window
+            ordered = sorted(list(recent) + [position], key=lambda i: str(timestamps[i]))
+            recent.clear()
+            recent.extend(ordered)
+        else:
+            recent.append(position)
+    
     def _load_csv_data(self) -> pd.DataFrame:
         """Load message history from CSV file."""
         if os.path.exists(self.csv_file):
+            if pa is not None:
+                try:
+                    return self._read_csv_arrow()
+                except Exception as e:
+                    logger.error(f"Error loading CSV data with pyarrow, retrying with pandas: {e}")
             try:
                 return pd.read_csv(self.csv_file)
             except Exception as e:
                 logger.error(f"Error loading CSV data: {e}")
         
         # Create empty DataFrame with required columns
-        return pd.DataFrame(columns=[
-            'message_id', 'user_id', 'platform', 'message_text', 
-            'timestamp', 'intent', 'urgency', 'summary', 'context_used'
-        ])
+        return pd.DataFrame(columns=CSV_COLUMNS + DERIVED_COLUMNS)
+    
+    def _read_csv_arrow(self) -> pd.DataFrame:
+        """Parse the history CSV with pyarrow's multithreaded reader over a memory map."""
+        with pa.memory_map(self.csv_file) as source:
+            table = pacsv.read_csv(
+                source,
+                read_options=pacsv.ReadOptions(use_threads=True, block_size=1 << 20),
+                # Message text may contain quoted newlines
+                parse_options=pacsv.ParseOptions(newlines_in_values=True),
+                # Keep ISO timestamps as strings and empty fields as nulls, like pd.read_csv
+                convert_options=pacsv.ConvertOptions(
+                    column_types={'timestamp': pa.string()},
+                    strings_can_be_null=True
+                )
+            )
+        df = table.to_pandas()
+        # Arrow yields None for null strings; use NaN like pd.read_csv so both readers index alike
+        return df.where(df.notna(), np.nan)
     
     def _save_csv_data(self):
-        """Save message history to CSV file."""
+        """Rewrite the full message history to CSV file."""
         try:
-            self.message_history.to_csv(self.csv_file, index=False)
+            # The append handle would point past the rewritten file's end
+            self._close_csv_handle()
+            with _atomic_open(self.csv_file, self.durable, newline='') as f:
+                self.message_history.to_csv(f, index=False, columns=self._stored_columns())
+            self._pending_rows = []
         except Exception as e:
             logger.error(f"Error saving CSV data: {e}")
     
+    def _flush_csv(self, force: bool = False):
+        """Append buffered rows to the CSV file once a full batch has accumulated."""
+        if not self._pending_rows or (len(self._pending_rows) < self.csv_batch_size and not force):
+            return
+        
+        try:
+            if self._csv_writer is None:
+                write_header = not os.path.exists(self.csv_file) or os.path.getsize(self.csv_file) == 0
+                self._csv_handle = open(self.csv_file, 'a', newline='', encoding='utf-8', buffering=1 << 20)
+                self._csv_writer = csv.DictWriter(self._csv_handle, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+                if write_header:
+                    self._csv_writer.writeheader()
+            self._csv_writer.writerows(self._pending_rows)
+            self._pending_rows = []
+        except Exception as e:
+            logger.error(f"Error appending CSV data: {e}")
+    
+    def _close_csv_handle(self):
+        """Close the shared CSV append handle, flushing its buffer."""
+        if self._csv_handle is not None:
+            self._csv_handle.close()
+            self._csv_handle = None
+            self._csv_writer = None
+    
     def load_past_messages(self, user_id: str, platform: str, limit: int = 3) -> List[Dict]:
         """
         Load past 3 messages from the same user for context.
@@ -99,15 +588,18 @@ class ContextLoader:
         Returns:
             List of past messages
         """
-        # Try CSV first for recent messages
-        if not self.message_history.empty:
-            user_messages = self.message_history[
-                (self.message_history['user_id'] == user_id) &
-                (self.message_history['platform'] == platform)
-            ].sort_values('timestamp', ascending=False).head(limit)
-            
-            if not user_messages.empty:
-                return user_messages.to_dict('records')
+        # Serve from the recent-message index when it holds enough rows
+        if limit <= self.recent_cache_size:
+            recent = self._recent.get((user_id, platform))
+            if recent:
+                return [self._row_dict(i) for i in itertools.islice(reversed(recent), limit)]
+        
+        # Cold path: pick the newest rows of this user-platform pair
+        elif (user_id, platform) in self._conversation_index:
+            timestamps = self._cols['timestamp']
+            positions = heapq.nlargest(limit, self._conversation_index[(user_id, platform)],
+                                       key=lambda i: str(timestamps[i]))
+            return [self._row_dict(i) for i in positions]
         
         # Fallback to JSON conversation data
         conversation_key = f"{user_id}_{platform}"
@@ -115,8 +607,9 @@ class ContextLoader:
         
         if conversation_key in conversations:
             messages = conversations[conversation_key]
-            # Return most recent messages
-            return messages[-limit:] if messages else []
+            # Return most recent messages, without the cached epoch
+            return [{key: value for key, value in msg.items() if key not in DERIVED_COLUMNS}
+                    for msg in messages[-limit:]]
         
         return []
     
@@ -128,10 +621,36 @@ class ContextLoader:
             message: Message dictionary with user_id, platform, message_text, etc.
             analysis: Optional analysis results (intent, urgency, summary, etc.)
         """
+        self.add_messages([message], [analysis])
+    
+    def add_messages(self, messages: List[Dict], analyses: List[Dict] = None):
+        """
+        Add a batch of messages to the context storage, persisting once per batch.
+        
+        Args:
+            messages: Message dictionaries with user_id, platform, message_text, etc.
+            analyses: Optional analysis results, parallel to messages
+        """
+        if analyses is None:
+            analyses = [None] * len(messages)
+        
+        with self._lock:
+            for message, analysis in zip(messages, analyses):
+                self._store_message(message, analysis)
+            
+            self._flush_csv()
+            self._schedule_flush()
+    
+    def _store_message(self, message: Dict, analysis: Dict = None):
+        """Add one message to the in-memory stores and the buffered JSON log."""
         try:
+            # One clock read per message for every default and the profile's last_seen
+            now = datetime.now()
+            now_iso = now.isoformat()
+            
             user_id = message.get('user_id', 'unknown')
             platform = message.get('platform', 'unknown')
-            message_id = message.get('message_id', f"msg_{datetime.now().timestamp()}")
+            message_id = message.get('message_id', f"msg_{now.timestamp()}")
             
             # Add to JSON conversation data
             conversation_key = f"{user_id}_{platform}"
@@ -142,21 +661,33 @@ class ContextLoader:
             if conversation_key not in self.conversation_data['conversations']:
                 self.conversation_data['conversations'][conversation_key] = []
             
+            timestamp = message.get('timestamp', now_iso)
             conversation_entry = {
                 'message_id': message_id,
                 'message_text': message.get('message_text', ''),
-                'timestamp': message.get('timestamp', datetime.now().isoformat()),
+                'timestamp': timestamp,
+                'ts_epoch': _parse_epoch(timestamp),
                 'analysis': analysis or {}
             }
             
-            self.conversation_data['conversations'][conversation_key].append(conversation_entry)
+            entries = self.conversation_data['conversations'][conversation_key]
+            in_order = not entries or conversation_entry['ts_epoch'] >= _entry_epoch(entries[-1])
+            entries.append(conversation_entry)
             
             # Keep only recent messages (within max_context_days)
-            cutoff_date = datetime.now() - timedelta(days=self.max_context_days)
-            self.conversation_data['conversations'][conversation_key] = [
-                entry for entry in self.conversation_data['conversations'][conversation_key]
-                if datetime.fromisoformat(entry['timestamp']) > cutoff_date
-            ]
+            cutoff = (now - timedelta(days=self.max_context_days)).timestamp()
+            if in_order:
+                # Timestamps are non-decreasing, so expired entries sit at the front
+                expired = 0
+                for entry in entries:
+                    if _entry_epoch(entry) > cutoff:
+                        break
+                    expired += 1
+                if expired:
+                    del entries[:expired]
+            else:
+                # A backdated message breaks the ordering; filter the whole list
+                entries[:] = [entry for entry in entries if _entry_epoch(entry) > cutoff]
             
             # Add to CSV history
             csv_entry = {
@@ -164,42 +695,48 @@ class ContextLoader:
                 'user_id': user_id,
                 'platform': platform,
                 'message_text': message.get('message_text', ''),
-                'timestamp': message.get('timestamp', datetime.now().isoformat()),
+                'timestamp': timestamp,
                 'intent': analysis.get('intent', '') if analysis else '',
                 'urgency': analysis.get('urgency', '') if analysis else '',
                 'summary': analysis.get('summary', '') if analysis else '',
-                'context_used': analysis.get('context_used', False) if analysis else False
+                'context_used': bool(analysis.get('context_used', False)) if analysis else False,
+                'ts_epoch': conversation_entry['ts_epoch'],
+                'msg_len': len(message.get('message_text', ''))
             }
             
-            # Convert to DataFrame row and append
-            new_row = pd.DataFrame([csv_entry])
-            self.message_history = pd.concat([self.message_history, new_row], ignore_index=True)
+            # Append to the column store; the CSV file catches up in batches
+            self._append_row(csv_entry)
+            self._pending_rows.append(csv_entry)
             
             # Update user profile
-            self._update_user_profile(user_id, platform, message, analysis)
+            self._update_user_profile(user_id, platform, message, analysis, seen_at=now_iso)
             
             # Clear cache for this user-platform combination
-            cache_key = f"{user_id}_{platform}"
-            if cache_key in self.context_cache:
-                del self.context_cache[cache_key]
-                del self.cache_expiry[cache_key]
+            self.context_cache.pop((user_id, platform), None)
             
-            # Save data
-            self._save_json_data()
-            self._save_csv_data()
+            # Log the entry; the background writer persists it
+            self._append_json_log({
+                'conversation_key': conversation_key,
+                'user_id': user_id,
+                'platform': platform,
+                'seen_at': now_iso,
+                'entry': conversation_entry
+            })
             
             logger.info(f"Added message {message_id} for {user_id} on {platform}")
             
         except Exception as e:
             logger.error(f"Error adding message: {e}")
     
-    def _update_user_profile(self, user_id: str, platform: str, message: Dict, analysis: Dict = None):
+    def _update_user_profile(self, user_id: str, platform: str, message: Dict, analysis: Dict = None,
+                             seen_at: str = None):
         """Update user profile with message patterns."""
-        if 'user_profiles' not in self.conversation_data:
-            self.conversation_data['user_profiles'] = {}
+        seen_at = seen_at or datetime.now().isoformat()
         
-        if user_id not in self.conversation_data['user_profiles']:
-            self.conversation_data['user_profiles'][user_id] = {
+        profiles = self.conversation_data.setdefault('user_profiles', {})
+        profile = profiles.get(user_id)
+        if profile is None:
+            profile = profiles[user_id] = {
                 'platforms': {},
                 'message_patterns': {
                     'intents': {},
@@ -208,36 +745,34 @@ class ContextLoader:
                 },
                 'activity_stats': {
                     'total_messages': 0,
-                    'first_seen': datetime.now().isoformat(),
-                    'last_seen': datetime.now().isoformat()
+                    'first_seen': seen_at,
+                    'last_seen': seen_at
                 }
             }
         
-        profile = self.conversation_data['user_profiles'][user_id]
-        
         # Update platform usage
-        if platform not in profile['platforms']:
-            profile['platforms'][platform] = 0
-        profile['platforms'][platform] += 1
+        platforms = profile['platforms']
+        platforms[platform] = platforms.get(platform, 0) + 1
         
         # Update activity stats
-        profile['activity_stats']['total_messages'] += 1
-        profile['activity_stats']['last_seen'] = datetime.now().isoformat()
+        activity_stats = profile['activity_stats']
+        activity_stats['total_messages'] += 1
+        activity_stats['last_seen'] = seen_at
         
         # Update patterns if analysis is available
         if analysis:
             intent = analysis.get('intent', '')
             urgency = analysis.get('urgency', '')
             
+            patterns = profile['message_patterns']
+            
             if intent:
-                if intent not in profile['message_patterns']['intents']:
-                    profile['message_patterns']['intents'][intent] = 0
-                profile['message_patterns']['intents'][intent] += 1
+                intents = patterns['intents']
+                intents[intent] = intents.get(intent, 0) + 1
             
             if urgency:
-                if urgency not in profile['message_patterns']['urgency_levels']:
-                    profile['message_patterns']['urgency_levels'][urgency] = 0
-                profile['message_patterns']['urgency_levels'][urgency] += 1
+                urgency_levels = patterns['urgency_levels']
+                urgency_levels[urgency] = urgency_levels.get(urgency, 0) + 1
     
     def get_context(self, user_id: str, platform: str, limit: int = 3) -> List[Dict]:
         """
@@ -251,20 +786,16 @@ class ContextLoader:
         Returns:
             List of context messages
         """
-        cache_key = f"{user_id}_{platform}"
-        
-        # Check cache first
-        if cache_key in self.context_cache:
-            cache_time = self.cache_expiry.get(cache_key, datetime.min)
-            if datetime.now() - cache_time < timedelta(minutes=5):  # 5-minute cache
-                return self.context_cache[cache_key][:limit]
+        # Cached until a message for this pair is stored, so no expiry check is needed
+        cached = self.context_cache.get((user_id, platform))
+        if cached is not None and limit in cached:
+            return cached[limit]
         
         # Load from storage
         context_messages = self.load_past_messages(user_id, platform, limit)
         
         # Cache the result
-        self.context_cache[cache_key] = context_messages
-        self.cache_expiry[cache_key] = datetime.now()
+        self.context_cache.setdefault((user_id, platform), {})[limit] = context_messages
         
         return context_messages
     
@@ -283,8 +814,14 @@ class ContextLoader:
         if not profile:
             return {'error': 'User not found'}
         
+        # Reuse the last result while the user's message count is unchanged
+        message_count = profile.get('activity_stats', {}).get('total_messages', 0)
+        cached = self._analytics_cache.get(user_id)
+        if cached and cached[0] == message_count:
+            return cached[1]
+        
         # Get message history for this user
-        user_messages = self.message_history[self.message_history['user_id'] == user_id]
+        user_messages = self._user_messages(user_id)
         
         analytics = {
             'basic_stats': {
@@ -296,18 +833,24 @@ class ContextLoader:
             'message_patterns': profile.get('message_patterns', {}),
             'recent_activity': self._get_recent_activity(user_id),
             'platform_preferences': self._analyze_platform_preferences(user_messages),
-            'communication_style': self._analyze_communication_style(user_messages)
+            'communication_style': self._analyze_communication_style(user_id, profile)
         }
         
+        self._analytics_cache[user_id] = (message_count, analytics)
         return analytics
     
+    def _user_messages(self, user_id: str) -> pd.DataFrame:
+        """Gather a user's history rows through the user_id row index."""
+        return self._gather_frame(self._user_index.get(user_id, []))
+    
     def _get_recent_activity(self, user_id: str, days: int = 7) -> Dict:
         """Get recent activity for a user."""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        user_messages = self.message_history[
-            (self.message_history['user_id'] == user_id) &
-            (pd.to_datetime(self.message_history['timestamp']) > cutoff_date)
-        ]
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+        
+        # Filter on the epoch column before gathering any rows
+        positions = np.asarray(self._user_index.get(user_id, []), dtype=np.intp)
+        recent = positions[self._column_array('ts_epoch')[positions] > cutoff]
+        user_messages = self._gather_frame(recent.tolist())
         
         return {
             'messages_last_7_days': len(user_messages),
@@ -324,24 +867,31 @@ class ContextLoader:
         platform_counts = user_messages['platform'].value_counts()
         total_messages = len(user_messages)
         
+        # Most common intent per platform from one pass over (platform, intent)
+        # pairs; ties go to the alphabetically first intent, like Series.mode()
+        pair_counts = user_messages[['platform', 'intent']].value_counts().reset_index(name='count')
+        pair_counts = pair_counts.sort_values(['count', 'intent'], ascending=[False, True], kind='stable')
+        top_intents = pair_counts.drop_duplicates('platform').set_index('platform')['intent']
+        
         preferences = {}
         for platform, count in platform_counts.items():
             preferences[platform] = {
                 'message_count': int(count),
                 'percentage': round((count / total_messages) * 100, 1),
-                'most_common_intent': user_messages[user_messages['platform'] == platform]['intent'].mode().iloc[0] if not user_messages[user_messages['platform'] == platform]['intent'].empty else 'unknown'
+                'most_common_intent': top_intents.get(platform, 'unknown')
             }
         
         return preferences
     
-    def _analyze_communication_style(self, user_messages: pd.DataFrame) -> Dict:
+    def _analyze_communication_style(self, user_id: str, profile: Dict) -> Dict:
         """Analyze user's communication style."""
-        if user_messages.empty:
+        positions = self._user_index.get(user_id, [])
+        if not positions:
             return {}
         
-        # Calculate average message length
-        message_lengths = user_messages['message_text'].str.len()
-        avg_length = message_lengths.mean() if not message_lengths.empty else 0
+        # Calculate average message length from the precomputed lengths
+        message_lengths = self._column_array('msg_len')[positions]
+        avg_length = float(message_lengths.mean()) if message_lengths.size else 0.0
         
         # Determine communication style
         if avg_length < 50:
@@ -351,15 +901,15 @@ class ContextLoader:
         else:
             style = 'detailed'
         
-        # Analyze urgency patterns
-        urgency_counts = user_messages['urgency'].value_counts()
-        most_common_urgency = urgency_counts.index[0] if not urgency_counts.empty else 'low'
+        # Analyze urgency patterns from the profile's running counts
+        urgency_levels = profile.get('message_patterns', {}).get('urgency_levels', {})
+        most_common_urgency = max(urgency_levels, key=urgency_levels.get) if urgency_levels else 'low'
         
         return {
             'average_message_length': round(avg_length, 1),
             'communication_style': style,
             'urgency_tendency': most_common_urgency,
-            'context_usage_rate': (user_messages['context_used'].sum() / len(user_messages)) * 100 if len(user_messages) > 0 else 0
+            'context_usage_rate': float(self._column_array('context_used')[positions].mean()) * 100
         }
     
     def search_similar_messages(self, query_text: str, limit: int = 5) -> List[Dict]:
@@ -373,38 +923,47 @@ class ContextLoader:
         Returns:
             List of similar messages with similarity scores
         """
-        if self.message_history.empty:
+        query_words = frozenset(query_text.lower().split())
+        token_ids = self._token_ids
+        postings = [self._postings[token_ids[word]] for word in query_words if word in token_ids]
+        if not postings:
             return []
         
-        query_words = set(query_text.lower().split())
-        similar_messages = []
+        # Intersection sizes for every row in one pass over the query's postings
+        positions = np.concatenate([np.frombuffer(posting, dtype=np.uintc) for posting in postings])
+        intersections = np.bincount(positions, minlength=len(self._doc_sizes))
+        hits = np.flatnonzero(intersections)
         
-        for _, row in self.message_history.iterrows():
-            message_text = str(row['message_text']).lower()
-            message_words = set(message_text.split())
-            
-            # Simple Jaccard similarity
-            intersection = len(query_words.intersection(message_words))
-            union = len(query_words.union(message_words))
-            
-            if union > 0:
-                similarity = intersection / union
-                
-                if similarity > 0.1:  # Minimum similarity threshold
-                    similar_messages.append({
-                        'message_id': row['message_id'],
-                        'user_id': row['user_id'],
-                        'platform': row['platform'],
-                        'message_text': row['message_text'],
-                        'timestamp': row['timestamp'],
-                        'similarity': similarity,
-                        'intent': row['intent'],
-                        'urgency': row['urgency']
-                    })
-        
-        # Sort by similarity and return top results
-        similar_messages.sort(key=lambda x: x['similarity'], reverse=True)
-        return similar_messages[:limit]
+        # Simple Jaccard similarity; |A ∪ B| = |A| + |B| - |A ∩ B|
+        hit_intersections = intersections[hits]
+        doc_sizes = np.asarray(self._doc_sizes)[hits]
+        similarities = hit_intersections / (len(query_words) + doc_sizes - hit_intersections)
+        
+        keep = similarities > 0.1  # Minimum similarity threshold
+        hits, similarities = hits[keep], similarities[keep]
+        
+        # Keep only the top results, ties in row order
+        if len(hits) > limit > 0:
+            kth = np.partition(similarities, len(similarities) - limit)[len(similarities) - limit]
+            keep = similarities >= kth
+            hits, similarities = hits[keep], similarities[keep]
+        order = np.lexsort((hits, -similarities))[:limit]
+        top = [(float(similarities[j]), int(hits[j])) for j in order]
+        
+        cols = self._cols
+        return [
+            {
+                'message_id': cols['message_id'][i],
+                'user_id': cols['user_id'][i],
+                'platform': cols['platform'][i],
+                'message_text': cols['message_text'][i],
+                'timestamp': cols['timestamp'][i],
+                'similarity': similarity,
+                'intent': cols['intent'][i],
+                'urgency': cols['urgency'][i]
+            }
+            for similarity, i in top
+        ]
     
     def export_data(self, output_file: str, format: str = 'json') -> bool:
         """
@@ -419,17 +978,27 @@ class ContextLoader:
         """
         try:
             if format.lower() == 'json':
-                export_data = {
-                    'conversations': self.conversation_data,
-                    'message_history': self.message_history.to_dict('records'),
-                    'export_timestamp': datetime.now().isoformat()
-                }
+                # Stream the history one row per line instead of materializing
+                # every record and the whole document in memory first
+                columns = self._stored_columns()
+                values = [self._cols[column] for column in columns]
                 
                 with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(export_data, f, indent=2, ensure_ascii=False)
+                    f.write('{"conversations": ')
+                    f.write(_json_dumps(self.conversation_data))
+                    f.write(',\n"message_history": [')
+                    for position in range(len(self._cols['message_id'])):
+                        if position:
+                            f.write(',')
+                        f.write('\n')
+                        f.write(_json_dumps({column: column_values[position]
+                                             for column, column_values in zip(columns, values)}))
+                    f.write('\n],\n"export_timestamp": ')
+                    f.write(_json_dumps(datetime.now().isoformat()))
+                    f.write('}\n')
                     
             elif format.lower() == 'csv':
-                self.message_history.to_csv(output_file, index=False)
+                self.message_history.to_csv(output_file, index=False, columns=self._stored_columns())
             else:
                 logger.error(f"Unsupported export format: {format}")
                 return False
@@ -452,59 +1021,62 @@ class ContextLoader:
         Returns:
             Success status
         """
-        try:
-            if format.lower() == 'json':
-                with open(input_file, 'r', encoding='utf-8') as f:
-                    import_data = json.load(f)
-                
-                # Merge conversation data
-                if 'conversations' in import_data:
-                    imported_conversations = import_data['conversations'].get('conversations', {})
-                    existing_conversations = self.conversation_data.get('conversations', {})
-                    
-                    for key, messages in imported_conversations.items():
-                        if key in existing_conversations:
-                            # Merge messages, avoiding duplicates
-                            existing_ids = {msg.get('message_id') for msg in existing_conversations[key]}
-                            new_messages = [msg for msg in messages if msg.get('message_id') not in existing_ids]
-                            existing_conversations[key].extend(new_messages)
-                        else:
-                            existing_conversations[key] = messages
+        with self._lock:
+            try:
+                if format.lower() == 'json':
+                    with open(input_file, 'r', encoding='utf-8') as f:
+                        import_data = _json_loads(f.read())
                     
-                    self.conversation_data['conversations'] = existing_conversations
-                
-                # Merge message history
-                if 'message_history' in import_data:
-                    imported_df = pd.DataFrame(import_data['message_history'])
+                    # Merge conversation data
+                    if 'conversations' in import_data:
+                        imported_conversations = import_data['conversations'].get('conversations', {})
+                        existing_conversations = self.conversation_data.get('conversations', {})
+                        
+                        for key, messages in imported_conversations.items():
+                            if key in existing_conversations:
+                                # Merge messages, avoiding duplicates
+                                existing_ids = {msg.get('message_id') for msg in existing_conversations[key]}
+                                new_messages = [msg for msg in messages if msg.get('message_id') not in existing_ids]
+                                existing_conversations[key].extend(new_messages)
+                            else:
+                                existing_conversations[key] = messages
+                        
+                        self.conversation_data['conversations'] = existing_conversations
                     
-                    # Avoid duplicates based on message_id
-                    existing_ids = set(self.message_history['message_id'].tolist())
-                    new_messages = imported_df[~imported_df['message_id'].isin(existing_ids)]
+                    # Merge message history
+                    if 'message_history' in import_data:
+                        imported_df = pd.DataFrame(import_data['message_history'])
+                        
+                        # Avoid duplicates based on message_id
+                        new_messages = imported_df[~imported_df['message_id'].isin(self._message_ids)]
+                        
+                        self._append_frame(new_messages)
+                        
+                elif format.lower() == 'csv':
+                    imported_df = pd.read_csv(input_file)
                     
-                    self.message_history = pd.concat([self.message_history, new_messages], ignore_index=True)
+                    # Avoid duplicates
+                    new_messages = imported_df[~imported_df['message_id'].isin(self._message_ids)]
                     
-            elif format.lower() == 'csv':
-                imported_df = pd.read_csv(input_file)
+                    self._append_frame(new_messages)
+                else:
+                    logger.error(f"Unsupported import format: {format}")
+                    return False
                 
-                # Avoid duplicates
-                existing_ids = set(self.message_history['message_id'].tolist())
-                new_messages = imported_df[~imported_df['message_id'].isin(existing_ids)]
+                # Conversations may have been merged without touching the history
+                self._data_version += 1
+                self.context_cache = {}
                 
-                self.message_history = pd.concat([self.message_history, new_messages], ignore_index=True)
-            else:
-                logger.error(f"Unsupported import format: {format}")
+                # Save merged data
+                self._save_json_data()
+                self._save_csv_data()
+                
+                logger.info(f"Data imported from {input_file}")
+                return True
+                
+            except Exception as e:
+                logger.error(f"Error importing data: {e}")
                 return False
-            
-            # Save merged data
-            self._save_json_data()
-            self._save_csv_data()
-            
-            logger.info(f"Data imported from {input_file}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error importing data: {e}")
-            return False
     
     def cleanup_old_data(self, days: int = None):
         """
@@ -516,47 +1088,61 @@ class ContextLoader:
         if days is None:
             days = self.max_context_days
         
-        cutoff_date = datetime.now() - timedelta(days=days)
+        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
         
-        # Clean JSON conversations
-        conversations = self.conversation_data.get('conversations', {})
-        for key, messages in conversations.items():
-            self.conversation_data['conversations'][key] = [
-                msg for msg in messages
-                if datetime.fromisoformat(msg['timestamp']) > cutoff_date
-            ]
-        
-        # Clean CSV history
-        self.message_history = self.message_history[
-            pd.to_datetime(self.message_history['timestamp']) > cutoff_date
-        ]
-        
-        # Save cleaned data
-        self._save_json_data()
-        self._save_csv_data()
-        
-        logger.info(f"Cleaned up data older than {days} days")
+        with self._lock:
+            # Clean JSON conversations
+            conversations = self.conversation_data.get('conversations', {})
+            for key, messages in conversations.items():
+                self.conversation_data['conversations'][key] = [
+                    msg for msg in messages if _entry_epoch(msg) > cutoff
+                ]
+            
+            # Clean CSV history
+            history = self.message_history
+            self.message_history = history[history['ts_epoch'].values > cutoff]
+            
+            # Save cleaned data
+            self._save_json_data()
+            self._save_csv_data()
+            
+            logger.info(f"Cleaned up data older than {days} days")
     
     def get_statistics(self) -> Dict:
         """Get overall statistics about the context data."""
+        if self._stats_cache and self._stats_cache[0] == self._data_version:
+            return self._stats_cache[1]
+        
         total_conversations = len(self.conversation_data.get('conversations', {}))
-        total_messages = len(self.message_history)
+        total_messages = len(self._cols['message_id'])
         unique_users = len(self.conversation_data.get('user_profiles', {}))
         
-        platform_stats = self.message_history['platform'].value_counts().to_dict() if not self.message_history.empty else {}
-        intent_stats = self.message_history['intent'].value_counts().to_dict() if not self.message_history.empty else {}
+        platform_counts = Counter({platform: len(rows) for platform, rows in self._platform_index.items()})
+        platform_stats = dict(platform_counts.most_common())
+        intent_counts = Counter({intent: len(rows) for intent, rows in self._intent_index.items()})
+        intent_stats = dict(intent_counts.most_common())
         
-        return {
+        # Oldest/newest by parsed epoch, reported as the stored timestamp strings
+        oldest_message = newest_message = None
+        epochs = self._column_array('ts_epoch')
+        if np.isfinite(epochs).any():
+            oldest_message = self._cols['timestamp'][int(np.nanargmin(epochs))]
+            newest_message = self._cols['timestamp'][int(np.nanargmax(epochs))]
+        
+        statistics = {
             'total_conversations': total_conversations,
             'total_messages': total_messages,
             'unique_users': unique_users,
             'platform_distribution': platform_stats,
             'intent_distribution': intent_stats,
             'data_range': {
-                'oldest_message': self.message_history['timestamp'].min() if not self.message_history.empty else None,
-                'newest_message': self.message_history['timestamp'].max() if not self.message_history.empty else None
+                'oldest_message': oldest_message,
+                'newest_message': newest_message
             }
         }
+        
+        self._stats_cache = (self._data_version, statistics)
+        return statistics
 
 
 # Example usage and testing
@@ -600,8 +1186,7 @@ if __name__ == "__main__":
     ]
     
     # Add messages
-    for message, analysis in zip(test_messages, test_analyses):
-        loader.add_message(message, analysis)
+    loader.add_messages(test_messages, test_analyses)
     
     print("✅ Messages added successfully")
     
@@ -621,4 +1206,5 @@ if __name__ == "__main__":
     stats = loader.get_statistics()
     print(f"📈 Overall stats: {stats['total_messages']} messages, {stats['unique_users']} users")
     
+    loader.close()
     print("✅ Context Loader tests completed!")
@@ -2,35 +2,78 @@ import json
 import os
 import getpass
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 import base64
 from typing import Optional, Dict
 from datetime import datetime
 
 CREDENTIALS_FILE = 'email_credentials.enc'
 
+# Header of AES-GCM credential files; anything else is a legacy Fernet token
+AESGCM_MAGIC = b'SBG1'
+AESGCM_NONCE_SIZE = 12
+# HKDF context separating the AES-GCM key from the Fernet key it is derived from
+AESGCM_KEY_INFO = b'SBG1 credentials'
+
+def _write_private(path: str, data: bytes):
+    """Atomically replace path with data, readable by the owner only."""
+    tmp_path = path + '.tmp'
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 class CredentialsManager:
     """Secure credentials manager for storing email credentials."""
     
+    # key file path -> (key, Fernet cipher, AES-GCM cipher), shared by every manager in the process
+    _key_cache = {}
+    
     def __init__(self, credentials_file='email_credentials.enc'):
         self.credentials_file = credentials_file
         self.key_file = 'encryption_key.key'
         self._load_or_generate_key()
+        
+        # (email, password, provider) of the AES-GCM file last written or read, to skip no-op rewrites
+        self._stored_identity = None
     
     def _load_or_generate_key(self):
         """Load existing encryption key or generate a new one."""
+        cache_key = os.path.abspath(self.key_file)
+        cached = CredentialsManager._key_cache.get(cache_key)
+        if cached:
+            self.key, self.cipher, self.aead = cached
+            return
+        
         if os.path.exists(self.key_file):
             with open(self.key_file, 'rb') as f:
                 self.key = f.read()
         else:
             self.key = Fernet.generate_key()
-            with open(self.key_file, 'wb') as f:
-                f.write(self.key)
+            _write_private(self.key_file, self.key)
         
+        # Fernet is only kept to read credentials saved before the switch to AES-GCM,
+        # whose AES-256 key is derived from the same key file rather than reusing its bytes
         self.cipher = Fernet(self.key)
+        hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=AESGCM_KEY_INFO)
+        self.aead = AESGCM(hkdf.derive(base64.urlsafe_b64decode(self.key)))
+        CredentialsManager._key_cache[cache_key] = (self.key, self.cipher, self.aead)
     
     def save_credentials(self, email_address: str, password: str, provider: str = 'gmail') -> bool:
         """Save encrypted credentials to file."""
         try:
+            identity = (email_address, password, provider)
+            if identity == self._stored_identity and os.path.exists(self.credentials_file):
+                print(f"✅ Credentials unchanged for {email_address}")
+                return True
+            
             credentials = {
                 'email_address': email_address,
                 'password': password,
@@ -38,11 +81,13 @@ class CredentialsManager:
                 'timestamp': str(datetime.now())  # Use current timestamp
             }
             
-            # Encrypt credentials
-            encrypted_data = self.cipher.encrypt(json.dumps(credentials).encode())
+            # Encrypt credentials; AES-GCM authenticates and encrypts in one pass
+            nonce = os.urandom(AESGCM_NONCE_SIZE)
+            encrypted_data = AESGCM_MAGIC + nonce + self.aead.encrypt(nonce, json.dumps(credentials).encode(), None)
             
-            with open(self.credentials_file, 'wb') as f:
-                f.write(encrypted_data)
+            # Readers never see a half-written file; the old one stays until the rename
+            _write_private(self.credentials_file, encrypted_data)
+            self._stored_identity = identity
             
             print(f"✅ Credentials saved for {email_address}")
             return True
@@ -60,9 +105,21 @@ class CredentialsManager:
             with open(self.credentials_file, 'rb') as f:
                 encrypted_data = f.read()
             
-            # Decrypt credentials
-            decrypted_data = self.cipher.decrypt(encrypted_data)
+            # Decrypt credentials, falling back to Fernet for files written by older versions
+            is_aesgcm = encrypted_data.startswith(AESGCM_MAGIC)
+            if is_aesgcm:
+                nonce_end = len(AESGCM_MAGIC) + AESGCM_NONCE_SIZE
+                nonce = encrypted_data[len(AESGCM_MAGIC):nonce_end]
+                decrypted_data = self.aead.decrypt(nonce, encrypted_data[nonce_end:], None)
+            else:
+                decrypted_data = self.cipher.decrypt(encrypted_data)
             credentials = json.loads(decrypted_data.decode())
+            # A legacy Fernet file is never "unchanged", so the next save upgrades it to AES-GCM
+            if is_aesgcm:
+                self._stored_identity = (credentials.get('email_address'), credentials.get('password'),
+                                         credentials.get('provider'))
+            else:
+                self._stored_identity = None
             
             return credentials
             
@@ -75,6 +132,7 @@ class CredentialsManager:
         try:
             if os.path.exists(self.credentials_file):
                 os.remove(self.credentials_file)
+                self._stored_identity = None
                 print("✅ Credentials cleared")
                 return True
             return False
@@ -8,6 +8,11 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import re
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Import your modules with proper error handling
 try:
     from email_reader import EmailReader
@@ -89,6 +94,16 @@ if 'email_credentials' not in st.session_state:
 
 # Simple Priority Tagger class (inline implementation)
 class SimplePriorityTagger:
+    # Keyword tables are built once; tag_email runs a C-level substring scan per keyword
+    URGENT_KEYWORDS = ('urgent', 'asap', 'immediately', 'emergency', 'critical', 'deadline')
+    MEETING_KEYWORDS = ('meeting', 'schedule', 'appointment', 'conference', 'call', 'zoom')
+    FINANCIAL_KEYWORDS = ('invoice', 'payment', 'bill', 'transaction', 'account', 'financial')
+    SECURITY_KEYWORDS = ('security', 'password', 'alert', 'suspicious', 'breach', 'verify')
+    PROMO_KEYWORDS = ('offer', 'sale', 'discount', 'deal', 'promotion', 'limited time')
+    NEWSLETTER_KEYWORDS = ('newsletter', 'weekly', 'monthly', 'updates', 'news')
+    IMPORTANT_SENDER_TERMS = ('ceo', 'manager', 'director', 'admin')
+    AUTOMATED_SENDER_TERMS = ('noreply', 'no-reply', 'automated')
+    
     def __init__(self):
         self.feedback_file = 'tagging_feedback.json'
         self.load_feedback()
@@ -97,8 +112,12 @@ class SimplePriorityTagger:
         """Load feedback data from file."""
         if os.path.exists(self.feedback_file):
             try:
-                with open(self.feedback_file, 'r') as f:
-                    self.feedback_data = json.load(f)
+                if orjson is not None:
+                    with open(self.feedback_file, 'rb') as f:
+                        self.feedback_data = orjson.loads(f.read())
+                else:
+                    with open(self.feedback_file, 'r') as f:
+                        self.feedback_data = json.load(f)
             except:
                 self.feedback_data = {
                     'tag_corrections': {},
@@ -115,18 +134,26 @@ class SimplePriorityTagger:
     def save_feedback(self):
         """Save feedback data to file."""
         try:
-            with open(self.feedback_file, 'w') as f:
-                json.dump(self.feedback_data, f, indent=2)
+            # Write a temp file and rename it so readers never see a partial file
+            tmp_file = self.feedback_file + '.tmp'
+            if orjson is not None:
+                with open(tmp_file, 'wb') as f:
+                    f.write(orjson.dumps(self.feedback_data, option=orjson.OPT_INDENT_2))
+            else:
+                with open(tmp_file, 'w') as f:
+                    json.dump(self.feedback_data, f, indent=2)
+            os.replace(tmp_file, self.feedback_file)
         except Exception as e:
             st.error(f"Error saving feedback: {e}")
     
     def tag_email(self, email):
         """Tag an email with priority category."""
-        subject = email.get('subject', '').lower()
-        body = email.get('body', '').lower()
+        subject = email.get('subject', '')
+        body = email.get('body', '')
         sender = email.get('sender', '').lower()
         
-        full_text = f"{subject} {body}"
+        # Lowercase the joined text in one pass rather than subject and body separately
+        full_text = f"{subject} {body}".lower()
         
         # Initialize scores
         scores = {
@@ -143,53 +170,47 @@ class SimplePriorityTagger:
         reasoning = []
         
         # Urgent keywords
-        urgent_keywords = ['urgent', 'asap', 'immediately', 'emergency', 'critical', 'deadline']
-        urgent_score = sum(1 for keyword in urgent_keywords if keyword in full_text)
+        urgent_score = sum(1 for keyword in self.URGENT_KEYWORDS if keyword in full_text)
         if urgent_score > 0:
             scores['URGENT'] += urgent_score * 0.3
             reasoning.append(f"Urgent keywords found ({urgent_score})")
         
         # Meeting keywords
-        meeting_keywords = ['meeting', 'schedule', 'appointment', 'conference', 'call', 'zoom']
-        meeting_score = sum(1 for keyword in meeting_keywords if keyword in full_text)
+        meeting_score = sum(1 for keyword in self.MEETING_KEYWORDS if keyword in full_text)
         if meeting_score > 0:
             scores['MEETING'] += meeting_score * 0.2
             reasoning.append(f"Meeting keywords found ({meeting_score})")
         
         # Financial keywords
-        financial_keywords = ['invoice', 'payment', 'bill', 'transaction', 'account', 'financial']
-        financial_score = sum(1 for keyword in financial_keywords if keyword in full_text)
+        financial_score = sum(1 for keyword in self.FINANCIAL_KEYWORDS if keyword in full_text)
         if financial_score > 0:
             scores['FINANCIAL'] += financial_score * 0.25
             reasoning.append(f"Financial keywords found ({financial_score})")
         
         # Security keywords
-        security_keywords = ['security', 'password', 'alert', 'suspicious', 'breach', 'verify']
-        security_score = sum(1 for keyword in security_keywords if keyword in full_text)
+        security_score = sum(1 for keyword in self.SECURITY_KEYWORDS if keyword in full_text)
         if security_score > 0:
             scores['SECURITY'] += security_score * 0.3
             reasoning.append(f"Security keywords found ({security_score})")
         
         # Promotional keywords
-        promo_keywords = ['offer', 'sale', 'discount', 'deal', 'promotion', 'limited time']
-        promo_score = sum(1 for keyword in promo_keywords if keyword in full_text)
+        promo_score = sum(1 for keyword in self.PROMO_KEYWORDS if keyword in full_text)
         if promo_score > 0:
             scores['PROMOTIONAL'] += promo_score * 0.15
             reasoning.append(f"Promotional keywords found ({promo_score})")
         
         # Newsletter indicators
-        newsletter_keywords = ['newsletter', 'weekly', 'monthly', 'updates', 'news']
-        newsletter_score = sum(1 for keyword in newsletter_keywords if keyword in full_text)
+        newsletter_score = sum(1 for keyword in self.NEWSLETTER_KEYWORDS if keyword in full_text)
         if newsletter_score > 0 or 'unsubscribe' in full_text:
             scores['NEWSLETTER'] += 0.2
             reasoning.append("Newsletter indicators found")
         
         # Sender-based scoring
         if sender:
-            if any(term in sender for term in ['ceo', 'manager', 'director', 'admin']):
+            if any(term in sender for term in self.IMPORTANT_SENDER_TERMS):
                 scores['IMPORTANT'] += 0.3
                 reasoning.append("Important sender detected")
-            elif any(term in sender for term in ['noreply', 'no-reply', 'automated']):
+            elif any(term in sender for term in self.AUTOMATED_SENDER_TERMS):
                 scores['NEWSLETTER'] += 0.2
                 reasoning.append("Automated sender detected")
         
@@ -201,7 +222,7 @@ class SimplePriorityTagger:
             reasoning.append(f"Learned preference for sender: {preferred_tag}")
         
         # Find the tag with highest score
-        best_tag = max(scores.keys(), key=lambda k: scores[k])
+        best_tag = max(scores, key=scores.get)
         confidence = min(scores[best_tag], 1.0)
         
         # Features for display
@@ -221,6 +242,15 @@ class SimplePriorityTagger:
     
     def process_feedback(self, email_id, correct_tag, predicted_tag, sender, feedback_quality=1.0):
         """Process user feedback for learning."""
+        # Repeated clicks with the same verdict change nothing worth rewriting the file for
+        previous = self.feedback_data['tag_corrections'].get(email_id)
+        if (previous
+                and (previous.get('correct'), previous.get('predicted'), previous.get('sender'), previous.get('quality'))
+                == (correct_tag, predicted_tag, sender, feedback_quality)
+                and (not sender or correct_tag == predicted_tag
+                     or self.feedback_data['sender_preferences'].get(sender) == correct_tag)):
+            return
+        
         # Store correction with consistent format
         self.feedback_data['tag_corrections'][email_id] = {
             'correct': correct_tag,
@@ -296,7 +326,7 @@ class SimpleSmartSuggestionsModule:
         return action_responses.get(action, {'success': False, 'message': 'Action not implemented'})
 
 # Initialize components
-@st.cache_data
+@st.cache_resource
 def initialize_components():
     """Initialize all AI components."""
     try:
@@ -342,17 +372,24 @@ def initialize_components():
 
 components = initialize_components()
 
+# Patterns used by clean_text_for_summary, compiled once at import
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+URL_RE = re.compile(r'https?://\S+')
+WHITESPACE_RE = re.compile(r'\s+')
+
 # Function to clean text for display and TTS
 def clean_text_for_summary(text):
     """Clean HTML and simplify links in text."""
     if not text:
         return ""
-    # Replace HTML tags with spaces
-    text = re.sub(r'<[^>]+>', ' ', text)
+    # Replace HTML tags with spaces; plain-text bodies skip the regex entirely
+    if '<' in text:
+        text = HTML_TAG_RE.sub(' ', text)
     # Replace links with a placeholder
-    text = re.sub(r'https?://\S+', '[Link]', text)
+    if 'http' in text:
+        text = URL_RE.sub('[Link]', text)
     # Replace multiple spaces with a single space
-    text = re.sub(r'\s+', ' ', text)
+    text = WHITESPACE_RE.sub(' ', text)
     return text.strip()
 
 # Sidebar Configuration
@@ -444,29 +481,27 @@ with col1:
                             email_reader.close_connection()
                             
                             if emails:
-                                emails_df = pd.DataFrame(emails)
-                                st.success(f"✅ Loaded {len(emails_df)} emails from {credentials['email_address']}")
+                                email_records = emails
+                                st.success(f"✅ Loaded {len(email_records)} emails from {credentials['email_address']}")
                             else:
                                 st.warning("⚠️ No emails found. Using mock emails.")
-                                emails_df = pd.DataFrame(EmailReader(use_mock=True).create_enhanced_mock_emails())
+                                email_records = EmailReader(use_mock=True).create_enhanced_mock_emails()
                         else:
                             st.error("❌ Failed to connect to email server. Using mock emails.")
-                            emails_df = pd.DataFrame(EmailReader(use_mock=True).create_enhanced_mock_emails())
+                            email_records = EmailReader(use_mock=True).create_enhanced_mock_emails()
                     else:
                         st.warning("⚠️ No email credentials provided. Using mock emails.")
-                        emails_df = pd.DataFrame(EmailReader(use_mock=True).create_enhanced_mock_emails())
+                        email_records = EmailReader(use_mock=True).create_enhanced_mock_emails()
                 else:
                     # Load mock emails
-                    emails_df = pd.DataFrame(EmailReader(use_mock=True).create_enhanced_mock_emails())
-                    st.success(f"✅ Loaded {len(emails_df)} mock emails")
+                    email_records = EmailReader(use_mock=True).create_enhanced_mock_emails()
+                    st.success(f"✅ Loaded {len(email_records)} mock emails")
                 
                 # Process each email
                 processed_emails = []
                 
                 progress_bar = st.progress(0)
-                for idx, (_, email_row) in enumerate(emails_df.iterrows()):
-                    email_dict = email_row.to_dict()
-                    
+                for idx, email_dict in enumerate(email_records):
                     # Extract metrics (with fallback)
                     body = email_dict.get('body', '')
                     subject = email_dict.get('subject', 'No Subject')
@@ -499,7 +534,7 @@ with col1:
                     }
                     
                     processed_emails.append(enriched_email)
-                    progress_bar.progress((idx + 1) / len(emails_df))
+                    progress_bar.progress((idx + 1) / len(email_records))
                 
                 # Prioritize emails
                 prioritized_emails = components['prioritizer'].prioritize_emails(processed_emails)
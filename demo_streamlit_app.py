@@ -15,6 +15,9 @@ from smart_summarizer_v3 import SmartSummarizerV3, summarize_message
 from context_loader import ContextLoader
 from feedback_system import FeedbackCollector
 
+# Urgency level -> indicator shown next to each analysed message
+URGENCY_ICONS = {'high': '🔴', 'medium': '🟡', 'low': '🟢'}
+
 # Page configuration
 st.set_page_config(
     page_title="SmartBrief v3 Demo",
@@ -256,7 +259,7 @@ def display_message_result(message, result, index):
         
         with col2:
             # Analysis results with better visibility
-            urgency_color = {'high': '🔴', 'medium': '🟡', 'low': '🟢'}[result['urgency']]
+            urgency_color = URGENCY_ICONS[result['urgency']]
             
             st.markdown(f"""
             <div class="metric-card intent-{result['urgency']}">
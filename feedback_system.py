@@ -12,6 +12,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Trailing UTC offset of an ISO-8601 timestamp ('Z', '+00:00', '-0530')
+ISO_OFFSET_PATTERN = r'(?:Z|[+-]\d{2}:?\d{2})$'
+
 class FeedbackCollector:
     """
     Collects and manages user feedback for the summarization system.
@@ -269,17 +272,24 @@ class FeedbackCollector:
     def _get_recent_feedback(self, days: int = 7) -> List[Dict]:
         """Get recent feedback entries."""
         cutoff_date = datetime.now() - timedelta(days=days)
-        recent_feedback = []
-        
-        for entry in self.feedback_data.get('feedback_entries', []):
-            try:
-                entry_date = datetime.fromisoformat(entry['timestamp'])
-                if entry_date > cutoff_date:
-                    recent_feedback.append(entry)
-            except:
-                continue
+        entries = self.feedback_data.get('feedback_entries', [])
         
-        return recent_feedback
+        is_recent = (self._parse_entry_dates(entries) > cutoff_date).to_numpy()
+        return [entry for entry, recent in zip(entries, is_recent) if recent]
+    
+    def _parse_entry_dates(self, entries: List[Dict]) -> pd.Series:
+        """Parse entry timestamps as naive local times; unparseable ones become NaT."""
+        timestamps = pd.Series([entry.get('timestamp') if isinstance(entry.get('timestamp'), str) else None
+                                for entry in entries], dtype=object)
+        # format='ISO8601' accepts every isoformat() variant instead of inferring one from the first entry
+        has_offset = timestamps.str.contains(ISO_OFFSET_PATTERN, regex=True, na=False).astype(bool)
+        local_times = pd.to_datetime(timestamps.where(~has_offset), format='ISO8601', errors='coerce')
+        if has_offset.any():
+            # Entries with an offset are converted to local time so they compare with the naive cutoffs
+            local_tz = datetime.now().astimezone().tzinfo
+            offset_times = pd.to_datetime(timestamps.where(has_offset), format='ISO8601', errors='coerce', utc=True)
+            local_times = local_times.where(~has_offset, offset_times.dt.tz_convert(local_tz).dt.tz_localize(None))
+        return local_times
     
     def _calculate_trends(self) -> Dict:
         """Calculate feedback trends."""
@@ -287,26 +297,20 @@ class FeedbackCollector:
         last_7_days = now - timedelta(days=7)
         previous_7_days = now - timedelta(days=14)
         
-        recent_feedback = []
-        previous_feedback = []
+        entries = self.feedback_data.get('feedback_entries', [])
+        entry_dates = self._parse_entry_dates(entries)
+        is_positive = pd.Series([entry.get('feedback_score', 0) for entry in entries], dtype=float) > 0
         
-        for entry in self.feedback_data.get('feedback_entries', []):
-            try:
-                entry_date = datetime.fromisoformat(entry['timestamp'])
-                if entry_date > last_7_days:
-                    recent_feedback.append(entry)
-                elif entry_date > previous_7_days:
-                    previous_feedback.append(entry)
-            except:
-                continue
+        is_recent = entry_dates > last_7_days
+        is_previous = (entry_dates > previous_7_days) & ~is_recent
         
         # Calculate satisfaction rates
-        recent_positive = sum(1 for fb in recent_feedback if fb['feedback_score'] > 0)
-        recent_total = len(recent_feedback)
+        recent_positive = int((is_recent & is_positive).sum())
+        recent_total = int(is_recent.sum())
         recent_rate = recent_positive / recent_total if recent_total > 0 else 0
         
-        previous_positive = sum(1 for fb in previous_feedback if fb['feedback_score'] > 0)
-        previous_total = len(previous_feedback)
+        previous_positive = int((is_previous & is_positive).sum())
+        previous_total = int(is_previous.sum())
         previous_rate = previous_positive / previous_total if previous_total > 0 else 0
         
         trend = recent_rate - previous_rate
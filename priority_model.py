@@ -1,3 +1,4 @@
+import heapq
 import json
 import os
 import numpy as np
@@ -243,9 +244,8 @@ class Prioritizer:
         if not self.q_table:
             return []
         
-        # Sort by Q-value
-        sorted_patterns = sorted(self.q_table.items(), key=lambda x: x[1], reverse=True)
-        return sorted_patterns[:limit]
+        # Top patterns by Q-value without sorting the whole table
+        return heapq.nlargest(limit, self.q_table.items(), key=lambda x: x[1])
     
     def reset_learning(self):
         """Reset Q-table and reward history."""
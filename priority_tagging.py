@@ -318,9 +318,7 @@ class PriorityTagger:
             feedback_quality = correction.get('feedback_quality', 0)
             
             # Count by tag
-            if original not in insights['most_corrected_tags']:
-                insights['most_corrected_tags'][original] = 0
-            insights['most_corrected_tags'][original] += 1
+            insights['most_corrected_tags'][original] = insights['most_corrected_tags'].get(original, 0) + 1
             
             # Count by feedback quality
             if feedback_quality > 0:
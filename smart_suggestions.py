@@ -380,22 +380,16 @@ class SmartSuggestionsModule:
         if email and 'sender' in email:
             sender = email.get('sender', '')
             sender_prefs = self.usage_stats.get('sender_preferences', {})
-            if sender not in sender_prefs:
-                sender_prefs[sender] = {}
-            if action not in sender_prefs[sender]:
-                sender_prefs[sender][action] = 0
-            sender_prefs[sender][action] += 1
+            sender_counts = sender_prefs.setdefault(sender, {})
+            sender_counts[action] = sender_counts.get(action, 0) + 1
             self.usage_stats['sender_preferences'] = sender_prefs
         
         # Track tag preferences if email is provided
         if email and 'tag' in email:
             tag = email.get('tag', 'GENERAL')
             tag_prefs = self.usage_stats.get('tag_preferences', {})
-            if tag not in tag_prefs:
-                tag_prefs[tag] = {}
-            if action not in tag_prefs[tag]:
-                tag_prefs[tag][action] = 0
-            tag_prefs[tag][action] += 1
+            tag_counts = tag_prefs.setdefault(tag, {})
+            tag_counts[action] = tag_counts.get(action, 0) + 1
             self.usage_stats['tag_preferences'] = tag_prefs
         
         self.save_usage_stats()
@@ -3,17 +3,37 @@ SmartBrief v3 - Context-Aware, Platform-Agnostic Message Summarizer
 Enhanced version with context intelligence, intent detection, and urgency analysis.
 """
 
+import atexit
 import json
+import mmap
 import os
 import re
+import weakref
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Summarizers whose context log may still need folding into their context file at exit
+_live_summarizers = weakref.WeakSet()
+
+
+def _flush_live_summarizers():
+    for summarizer in list(_live_summarizers):
+        summarizer.flush()
+
+
+atexit.register(_flush_live_summarizers)
+
 class SmartSummarizerV3:
     """
     Advanced message summarizer with context awareness and platform optimization.
@@ -26,14 +46,28 @@ class SmartSummarizerV3:
     - Embeddable design for integration into existing systems
     """
     
-    def __init__(self, context_file: str = 'message_context.json', max_context_messages: int = 3, confidence_threshold: float = 0.6):
+    def __init__(self, context_file: str = 'message_context.json', max_context_messages: int = 3, confidence_threshold: float = 0.6,
+                 compact_every: int = 500, durable: bool = False):
         self.context_file = context_file
         self.max_context_messages = max_context_messages
         self.confidence_threshold = confidence_threshold
         
+        # New context messages go to an append-only log, folded into
+        # context_file every compact_every messages and on exit
+        self.context_log_file = context_file + '.log'
+        self.compact_every = compact_every
+        self._context_log = None
+        self._log_entries = 0
+        
+        # fsync the snapshot before renaming it into place
+        self.durable = durable
+        
         # Load existing context
         self.context_data = self._load_context()
         
+        # Folded in at exit unless close() ran first; held weakly so short-lived instances are freed
+        _live_summarizers.add(self)
+        
         # Platform-specific settings
         self.platform_configs = {
             'whatsapp': {
@@ -143,9 +177,9 @@ class SmartSummarizerV3:
         self.stats = {
             'processed': 0,
             'context_used': 0,
-            'platforms': {},
-            'intents': {},
-            'urgency_levels': {},
+            'platforms': Counter(),
+            'intents': Counter(),
+            'urgency_levels': Counter(),
             'unique_users': set()
         }
     
@@ -153,21 +187,115 @@ class SmartSummarizerV3:
         """Load conversation context from file."""
         if os.path.exists(self.context_file):
             try:
-                with open(self.context_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Clean old messages (older than 30 days)
-                    self._cleanup_old_context(data)
-                    return data
+                if orjson is not None:
+                    # Parse straight out of a read-only mapping instead of copying the file into a bytes object
+                    with open(self.context_file, 'rb') as f:
+                        if os.fstat(f.fileno()).st_size == 0:
+                            data = {'conversations': {}, 'user_profiles': {}}
+                        else:
+                            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                                data = orjson.loads(view)
+                else:
+                    with open(self.context_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
             except Exception as e:
                 logger.error(f"Error loading context: {e}")
+                data = {'conversations': {}, 'user_profiles': {}}
+        else:
+            data = {'conversations': {}, 'user_profiles': {}}
         
-        return {'conversations': {}, 'user_profiles': {}}
+        self._replay_context_log(data)
+        # Clean old messages (older than 30 days)
+        self._cleanup_old_context(data)
+        return data
+    
+    def _replay_context_log(self, data: Dict):
+        """Fold messages from the append-only log into freshly loaded context data."""
+        if not os.path.exists(self.context_log_file):
+            return
+        
+        try:
+            with open(self.context_log_file, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = orjson.loads(line) if orjson is not None else json.loads(line)
+                    except ValueError:
+                        # Torn final line from an interrupted write
+                        logger.warning("Skipping malformed line in context log")
+                        continue
+                    
+                    context_key = record['context_key']
+                    context_message = record['message']
+                    
+                    # Already folded into the snapshot by an interrupted compaction
+                    stored = data.get('conversations', {}).get(context_key, [])
+                    if any(msg.get('message_id') == context_message.get('message_id') for msg in stored):
+                        continue
+                    
+                    self._append_context_message(data, context_key, context_message)
+                    self._log_entries += 1
+        except Exception as e:
+            logger.error(f"Error replaying context log: {e}")
+    
+    def _append_context_log(self, context_key: str, context_message: Dict):
+        """Append one stored message to the context log, compacting once it has grown."""
+        record = {'context_key': context_key, 'message': context_message}
+        try:
+            if self._context_log is None:
+                # Line-buffered so other instances see each message right away
+                self._context_log = open(self.context_log_file, 'a', encoding='utf-8', buffering=1)
+            if orjson is not None:
+                self._context_log.write(orjson.dumps(record).decode('utf-8') + '\n')
+            else:
+                self._context_log.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._log_entries += 1
+        except Exception as e:
+            logger.error(f"Error appending to context log: {e}")
+            return
+        
+        if self._log_entries >= self.compact_every:
+            self._save_context()
+    
+    def flush(self):
+        """Fold the context log into the context file."""
+        # A missing log means there is nothing left to fold (or its directory is gone)
+        if self._log_entries and os.path.exists(self.context_log_file):
+            self._save_context()
+    
+    def close(self):
+        """Fold the context log into the context file and release the log handle."""
+        self.flush()
+        if self._context_log is not None:
+            self._context_log.close()
+            self._context_log = None
+        _live_summarizers.discard(self)
     
     def _save_context(self):
-        """Save conversation context to file."""
+        """Save conversation context to file and truncate the append-only log."""
         try:
-            with open(self.context_file, 'w', encoding='utf-8') as f:
-                json.dump(self.context_data, f, indent=2, ensure_ascii=False)
+            if orjson is not None:
+                data = orjson.dumps(self.context_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            else:
+                data = json.dumps(self.context_data, indent=2, ensure_ascii=False).encode('utf-8')
+            
+            # Write then rename, so a crash never leaves a truncated context file
+            tmp_file = self.context_file + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+                if self.durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_file, self.context_file)
+            
+            # Everything in the log is now part of the snapshot
+            if self._context_log is not None:
+                self._context_log.close()
+                self._context_log = None
+            if os.path.exists(self.context_log_file):
+                os.remove(self.context_log_file)
+            self._log_entries = 0
         except Exception as e:
             logger.error(f"Error saving context: {e}")
     
@@ -181,9 +309,18 @@ class SmartSummarizerV3:
             # Filter out old messages
             data['conversations'][user_platform] = [
                 msg for msg in messages
-                if datetime.fromisoformat(msg.get('timestamp', '1970-01-01T00:00:00')).timestamp() > cutoff_timestamp
+                if self._message_epoch(msg) > cutoff_timestamp
             ]
     
+    def _message_epoch(self, msg: Dict) -> float:
+        """Return a context message's timestamp as epoch seconds, caching it on the message."""
+        if 'ts_epoch' not in msg:
+            try:
+                msg['ts_epoch'] = datetime.fromisoformat(msg.get('timestamp', '1970-01-01T00:00:00')).timestamp()
+            except (TypeError, ValueError):
+                msg['ts_epoch'] = 0.0  # Unparseable; treated as expired
+        return msg['ts_epoch']
+    
     def _get_context_key(self, user_id: str, platform: str) -> str:
         """Generate context key for user-platform combination."""
         return f"{user_id}_{platform}"
@@ -206,28 +343,27 @@ class SmartSummarizerV3:
         platform = message_data.get('platform', 'unknown')
         context_key = self._get_context_key(user_id, platform)
         
-        # Initialize if not exists
-        if 'conversations' not in self.context_data:
-            self.context_data['conversations'] = {}
-        
-        if context_key not in self.context_data['conversations']:
-            self.context_data['conversations'][context_key] = []
-        
         # Add message to context
+        now = datetime.now()
         context_message = {
             'message_text': message_data.get('message_text', ''),
-            'timestamp': message_data.get('timestamp', datetime.now().isoformat()),
-            'message_id': message_data.get('message_id', f"msg_{datetime.now().timestamp()}")
+            'timestamp': message_data.get('timestamp', now.isoformat()),
+            'message_id': message_data.get('message_id', f"msg_{now.timestamp()}")
         }
+        # Parse once on the write path so cleanup never re-parses stored messages
+        self._message_epoch(context_message)
         
-        self.context_data['conversations'][context_key].append(context_message)
+        self._append_context_message(self.context_data, context_key, context_message)
+        self._append_context_log(context_key, context_message)
+    
+    def _append_context_message(self, data: Dict, context_key: str, context_message: Dict):
+        """Add a message to a conversation, keeping only the most recent ones."""
+        messages = data.setdefault('conversations', {}).setdefault(context_key, [])
+        messages.append(context_message)
         
         # Keep only recent messages
-        if len(self.context_data['conversations'][context_key]) > self.max_context_messages * 2:
-            self.context_data['conversations'][context_key] = \
-                self.context_data['conversations'][context_key][-self.max_context_messages * 2:]
-        
-        self._save_context()
+        if len(messages) > self.max_context_messages * 2:
+            del messages[:-self.max_context_messages * 2]
     
     def _classify_intent(self, text: str, context_messages: List[Dict] = None) -> tuple:
         """Classify the intent of the message with context awareness."""
@@ -436,16 +572,8 @@ class SmartSummarizerV3:
         self.stats['processed'] += 1
         self.stats['unique_users'].add(user_id)
         
-        if platform not in self.stats['platforms']:
-            self.stats['platforms'][platform] = 0
         self.stats['platforms'][platform] += 1
-        
-        if intent not in self.stats['intents']:
-            self.stats['intents'][intent] = 0
         self.stats['intents'][intent] += 1
-        
-        if urgency not in self.stats['urgency_levels']:
-            self.stats['urgency_levels'][urgency] = 0
         self.stats['urgency_levels'][urgency] += 1
     
     def summarize(self, message_data: Dict, use_context: bool = True) -> Dict:
@@ -586,6 +714,8 @@ class SmartSummarizerV3:
         """Get processing statistics."""
         stats = self.stats.copy()
         stats['unique_users'] = len(stats['unique_users'])
+        for key in ('platforms', 'intents', 'urgency_levels'):
+            stats[key] = dict(stats[key])
         stats['context_usage_rate'] = (stats['context_used'] / max(1, stats['processed']))
         stats['total_context_entries'] = stats['context_used']
         return stats
@@ -595,9 +725,9 @@ class SmartSummarizerV3:
         self.stats = {
             'processed': 0,
             'context_used': 0,
-            'platforms': {},
-            'intents': {},
-            'urgency_levels': {},
+            'platforms': Counter(),
+            'intents': Counter(),
+            'urgency_levels': Counter(),
             'unique_users': set()
         }
 
@@ -642,7 +772,10 @@ def summarize_message(message_text: str, platform: str = 'email', user_id: str =
         'timestamp': datetime.now().isoformat()
     }
     
-    return summarizer.summarize(message, use_context=False)
+    try:
+        return summarizer.summarize(message, use_context=False)
+    finally:
+        summarizer.close()
 
 
 # Example usage and testing
@@ -12,6 +12,11 @@ from smart_summarizer_v3 import SmartSummarizerV3, summarize_message
 from context_loader import ContextLoader
 from feedback_system import FeedbackCollector, FeedbackEnhancedSummarizer
 
+try:
+    from credentials_manager import CredentialsManager
+except ImportError:  # cryptography is only needed for the email integration
+    CredentialsManager = None
+
 class TestSmartSummarizerV3(unittest.TestCase):
     """Test cases for SmartSummarizerV3 core functionality."""
     
@@ -208,6 +213,45 @@ class TestSmartSummarizerV3(unittest.TestCase):
         context = new_summarizer.get_user_context(message['user_id'], message['platform'])
         self.assertGreater(len(context), 0)
     
+    def test_context_log_replay_and_compaction(self):
+        """Test that logged context is replayed on load and folded in by compaction."""
+        log_file = self.context_file + '.log'
+        for i in range(3):
+            self.summarizer.summarize({
+                'user_id': 'log_user',
+                'platform': 'slack',
+                'message_text': f'Log message {i}',
+                'timestamp': datetime.now().isoformat(),
+                'message_id': f'log_msg_{i}'
+            })
+        self.assertTrue(os.path.exists(log_file))
+        
+        # A second instance replays the log without duplicating entries
+        replayed = SmartSummarizerV3(context_file=self.context_file)
+        self.assertEqual(len(replayed.get_user_context('log_user', 'slack')), 3)
+        replayed.close()
+        
+        # Closing folds the log into the snapshot and releases the handle
+        self.summarizer.close()
+        self.assertFalse(os.path.exists(log_file))
+        self.assertIsNone(self.summarizer._context_log)
+        compacted = SmartSummarizerV3(context_file=self.context_file)
+        self.assertEqual(len(compacted.get_user_context('log_user', 'slack')), 3)
+        compacted.close()
+        
+        # Reaching compact_every folds the log without waiting for close()
+        small = SmartSummarizerV3(context_file=self.context_file, compact_every=2)
+        for i in range(2):
+            small.summarize({
+                'user_id': 'compact_user',
+                'platform': 'email',
+                'message_text': f'Compact message {i}',
+                'timestamp': datetime.now().isoformat(),
+                'message_id': f'compact_msg_{i}'
+            })
+        self.assertFalse(os.path.exists(log_file))
+        small.close()
+    
     def test_convenience_function(self):
         """Test the convenience summarize_message function."""
         message = self.test_messages[0]
@@ -236,6 +280,7 @@ class TestContextLoader(unittest.TestCase):
     def tearDown(self):
         """Clean up test environment."""
         import shutil
+        self.loader.close()
         shutil.rmtree(self.temp_dir, ignore_errors=True)
     
     def test_message_storage(self):
@@ -263,6 +308,73 @@ class TestContextLoader(unittest.TestCase):
         self.assertEqual(len(context), 1)
         self.assertEqual(context[0]['message_text'], 'Test message')
     
+    def test_batch_message_storage(self):
+        """Test adding several messages in one batch."""
+        messages = [
+            {
+                'user_id': 'batch_user',
+                'platform': 'slack',
+                'message_text': f'Batch message {i}',
+                'timestamp': datetime.now().isoformat(),
+                'message_id': f'batch_msg_{i}'
+            }
+            for i in range(4)
+        ]
+        analyses = [{'intent': 'request', 'urgency': 'low'} for _ in messages]
+        
+        self.loader.add_messages(messages, analyses)
+        
+        past_messages = self.loader.load_past_messages('batch_user', 'slack', limit=10)
+        self.assertEqual(len(past_messages), 4)
+        # Derived in-memory columns are not part of the returned messages
+        self.assertNotIn('ts_epoch', past_messages[0])
+        self.assertNotIn('msg_len', past_messages[0])
+        self.assertNotIn('ts_epoch', self.loader.load_past_messages('batch_user', 'slack', limit=50)[0])
+        
+        analytics = self.loader.get_user_analytics('batch_user')
+        self.assertEqual(analytics['basic_stats']['total_messages'], 4)
+        self.assertEqual(analytics['message_patterns']['intents']['request'], 4)
+    
+    def test_backdated_message_expires(self):
+        """Test that a message older than the context window is dropped even when it arrives late."""
+        now = datetime.now()
+        for message_id, age in (('recent_msg', timedelta(hours=1)), ('backdated_msg', timedelta(days=60))):
+            self.loader.add_message({
+                'user_id': 'late_user',
+                'platform': 'email',
+                'message_text': f'Message {message_id}',
+                'timestamp': (now - age).isoformat(),
+                'message_id': message_id
+            })
+        
+        entries = self.loader.conversation_data['conversations']['late_user_email']
+        self.assertEqual([entry['message_id'] for entry in entries], ['recent_msg'])
+    
+    def test_context_cache_invalidation(self):
+        """Test that cached context respects the limit and new messages."""
+        for i in range(3):
+            self.loader.add_message({
+                'user_id': 'cache_user',
+                'platform': 'email',
+                'message_text': f'Cached message {i}',
+                'timestamp': datetime.now().isoformat(),
+                'message_id': f'cache_msg_{i}'
+            })
+        
+        self.assertEqual(len(self.loader.get_context('cache_user', 'email', limit=1)), 1)
+        self.assertEqual(len(self.loader.get_context('cache_user', 'email', limit=3)), 3)
+        
+        self.loader.add_message({
+            'user_id': 'cache_user',
+            'platform': 'email',
+            'message_text': 'Newest message',
+            'timestamp': datetime.now().isoformat(),
+            'message_id': 'cache_msg_3'
+        })
+        
+        context = self.loader.get_context('cache_user', 'email', limit=1)
+        self.assertEqual(context[0]['message_text'], 'Newest message')
+    
     def test_user_analytics(self):
         """Test user analytics generation."""
         # Add multiple messages for a user
@@ -347,6 +459,98 @@ class TestContextLoader(unittest.TestCase):
         # Verify imported data
         context = new_loader.get_context('export_user', 'slack')
         self.assertGreater(len(context), 0)
+        new_loader.close()
+
+    def test_json_log_persistence(self):
+        """Test that logged messages survive a reload before and after compaction."""
+        for i in range(3):
+            self.loader.add_message({
+                'user_id': 'log_user',
+                'platform': 'email',
+                'message_text': f'Log message {i+1}',
+                'timestamp': datetime.now().isoformat(),
+                'message_id': f'log_msg_{i+1}'
+            })
+
+        self.loader._json_log.flush()
+        reloaded = ContextLoader(json_file=self.json_file, csv_file=self.csv_file)
+        self.assertEqual(len(reloaded.conversation_data['conversations']['log_user_email']), 3)
+        reloaded.close()
+
+        self.loader.close()
+        self.assertFalse(os.path.exists(self.json_file + '.log'))
+        compacted = ContextLoader(json_file=self.json_file, csv_file=self.csv_file)
+        self.assertEqual(len(compacted.conversation_data['conversations']['log_user_email']), 3)
+        self.assertEqual(
+            compacted.conversation_data['user_profiles']['log_user']['activity_stats']['total_messages'], 3
+        )
+        compacted.close()
+    
+    def test_compaction_with_legacy_entries(self):
+        """Test that entries without a valid timestamp expire instead of breaking compaction."""
+        self.loader.close()
+        with open(self.json_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'conversations': {'legacy_user_email': [
+                    {'message_id': 'no_timestamp', 'message_text': 'Missing'},
+                    {'message_id': 'bad_timestamp', 'message_text': 'Malformed', 'timestamp': 'yesterday'},
+                    {'message_id': 'valid', 'message_text': 'Valid', 'timestamp': datetime.now().isoformat()}
+                ]},
+                'user_profiles': {},
+                'metadata': {}
+            }, f)
+        
+        self.loader = ContextLoader(json_file=self.json_file, csv_file=self.csv_file)
+        self.loader.add_message({
+            'user_id': 'legacy_user',
+            'platform': 'email',
+            'message_text': 'New message',
+            'timestamp': datetime.now().isoformat(),
+            'message_id': 'new_msg'
+        })
+        self.loader.close()
+        
+        self.assertFalse(os.path.exists(self.json_file + '.log'))
+        self.assertTrue(os.path.exists(self.csv_file))
+        reloaded = ContextLoader(json_file=self.json_file, csv_file=self.csv_file)
+        entries = reloaded.conversation_data['conversations']['legacy_user_email']
+        self.assertEqual([entry['message_id'] for entry in entries], ['valid', 'new_msg'])
+        self.assertEqual(len(reloaded.message_history), 1)
+        reloaded.close()
+    
+    def test_null_history_values_not_indexed(self):
+        """Test that null cells, as the pyarrow reader returns them, stay out of the indexes."""
+        row = {column: None for column in ['message_id', 'user_id', 'platform', 'message_text',
+                                           'timestamp', 'intent', 'urgency', 'summary', 'context_used']}
+        row.update(message_id='null_msg', user_id='null_user', platform='email',
+                   message_text='Null fields', timestamp=datetime.now().isoformat())
+        self.loader._append_row(row)
+        
+        statistics = self.loader.get_statistics()
+        self.assertEqual(statistics['intent_distribution'], {})
+        self.assertEqual(statistics['platform_distribution'], {'email': 1})
+    
+    def test_multiline_history_reload(self):
+        """Test that multi-line message text survives a CSV reload larger than one read block."""
+        padding = 'x' * 400
+        messages = [
+            {
+                'user_id': 'multiline_user',
+                'platform': 'email',
+                'message_text': f'First line {i}\nSecond line {padding}',
+                'timestamp': datetime.now().isoformat(),
+                'message_id': f'multiline_msg_{i}'
+            }
+            for i in range(3000)
+        ]
+        self.loader.add_messages(messages)
+        self.loader.flush()
+        
+        reloaded = ContextLoader(json_file=self.json_file, csv_file=self.csv_file)
+        history = reloaded.message_history
+        self.assertEqual(len(history), 3000)
+        self.assertEqual(history['message_text'].iloc[-1], f'First line 2999\nSecond line {padding}')
+        reloaded.close()
 
 
 class TestFeedbackSystem(unittest.TestCase):
@@ -405,6 +609,23 @@ class TestFeedbackSystem(unittest.TestCase):
         self.assertEqual(analytics['overall_metrics']['total_feedback'], 5)
         self.assertGreater(analytics['overall_metrics']['positive_feedback'], 0)
     
+    def test_recent_feedback_mixed_timestamp_formats(self):
+        """Test that recent feedback keeps every ISO timestamp variant."""
+        yesterday = datetime.now() - timedelta(days=1)
+        self.collector.feedback_data['feedback_entries'] = [
+            {'timestamp': yesterday.isoformat(), 'feedback_score': 1},
+            {'timestamp': yesterday.replace(microsecond=0).isoformat(), 'feedback_score': 1},
+            {'timestamp': yesterday.astimezone().isoformat(), 'feedback_score': -1},
+            {'timestamp': (datetime.now() - timedelta(days=30)).isoformat(), 'feedback_score': 1},
+            {'timestamp': 'not a timestamp', 'feedback_score': 1}
+        ]
+        
+        recent = self.collector._get_recent_feedback(days=7)
+        self.assertEqual(len(recent), 3)
+        
+        trends = self.collector._calculate_trends()
+        self.assertAlmostEqual(trends['recent_satisfaction_rate'], 2 / 3)
+    
     def test_platform_feedback_summary(self):
         """Test platform-specific feedback summary."""
         # Add feedback for specific platform
@@ -457,6 +678,69 @@ class TestFeedbackSystem(unittest.TestCase):
         self.assertTrue(success)
 
 
+@unittest.skipIf(CredentialsManager is None, "cryptography is not installed")
+class TestCredentialsManager(unittest.TestCase):
+    """Test cases for encrypted credential storage."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        # The key file path is relative, so run each test in its own directory
+        self.temp_dir = tempfile.mkdtemp()
+        self.original_cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+        CredentialsManager._key_cache.clear()
+        self.manager = CredentialsManager()
+    
+    def tearDown(self):
+        """Clean up test environment."""
+        import shutil
+        os.chdir(self.original_cwd)
+        CredentialsManager._key_cache.clear()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _read_credentials_file(self):
+        with open(self.manager.credentials_file, 'rb') as f:
+            return f.read()
+    
+    def test_credentials_round_trip(self):
+        """Test that saved credentials are written as AES-GCM and load back."""
+        self.assertTrue(self.manager.save_credentials('user@example.com', 'app-password', 'gmail'))
+        self.assertTrue(self._read_credentials_file().startswith(b'SBG1'))
+        
+        CredentialsManager._key_cache.clear()
+        credentials = CredentialsManager().load_credentials()
+        self.assertEqual(credentials['email_address'], 'user@example.com')
+        self.assertEqual(credentials['password'], 'app-password')
+        self.assertEqual(credentials['provider'], 'gmail')
+    
+    def test_legacy_fernet_credentials(self):
+        """Test that a Fernet file from older versions loads and is upgraded on save."""
+        legacy = {
+            'email_address': 'legacy@example.com',
+            'password': 'old-password',
+            'provider': 'outlook',
+            'timestamp': str(datetime.now())
+        }
+        with open(self.manager.credentials_file, 'wb') as f:
+            f.write(self.manager.cipher.encrypt(json.dumps(legacy).encode()))
+        
+        credentials = self.manager.load_credentials()
+        self.assertEqual(credentials['email_address'], 'legacy@example.com')
+        self.assertEqual(credentials['provider'], 'outlook')
+        
+        # Saving the same credentials still rewrites the file in the new format
+        self.assertTrue(self.manager.save_credentials('legacy@example.com', 'old-password', 'outlook'))
+        self.assertTrue(self._read_credentials_file().startswith(b'SBG1'))
+        self.assertEqual(self.manager.load_credentials()['password'], 'old-password')
+    
+    def test_files_are_private(self):
+        """Test that the key and credentials files are readable by the owner only."""
+        self.manager.save_credentials('user@example.com', 'app-password')
+        
+        self.assertEqual(os.stat(self.manager.key_file).st_mode & 0o777, 0o600)
+        self.assertEqual(os.stat(self.manager.credentials_file).st_mode & 0o777, 0o600)
+
+
 class TestIntegration(unittest.TestCase):
     """Integration tests for the complete system."""
     
@@ -476,6 +760,7 @@ class TestIntegration(unittest.TestCase):
     def tearDown(self):
         """Clean up integration test environment."""
         import shutil
+        self.context_loader.close()
         shutil.rmtree(self.temp_dir, ignore_errors=True)
     
     def test_full_workflow(self):
@@ -1,6 +1,7 @@
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
+import heapq
 import json
 import os
 
@@ -33,7 +34,7 @@ def create_dashboard(emails_df, brief_summary="", reward_history=None, q_table_f
         with open(q_table_file, 'r') as f:
             q_table = json.load(f)
         q_scores = [(state, sum(actions.values())) for state, actions in q_table.items()]
-        top_q = sorted(q_scores, key=lambda x: x[1], reverse=True)[:10]
+        top_q = heapq.nlargest(10, q_scores, key=lambda x: x[1])
         states, scores = zip(*top_q)
         sns.barplot(x=scores, y=states, ax=axs[2], palette='viridis')
         axs[2].set_title("🏆 Top Q-Value States")